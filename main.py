@@ -401,3 +401,86 @@ print("Residual importance:", Imp3)
 
 
 # %%
+
+# %% ======================================================
+# Joint test selection for the 2-module battery pack with on/off mode variables and with forward and backward
+# mode variables, defined in one BDD. Both configurations implement the same residuals, so they are given the
+# common labels in tests and each selected residual is used in both configurations.
+
+bdd = BDD()
+bdd.declare("on1", "on2", "f1", "b1", "f2", "b2")
+on1 = bdd.add_expr("on1")
+on2 = bdd.add_expr("on2")
+t = bdd.true
+f = bdd.false
+
+FSM_on = [
+    [f, f, f, f, t, f, f, on2],
+    [f, f, f, t, t, t, f, f],
+    [f, f, f, t, f, t, f, on2],
+    [f, t, f, f, f, f, f, on1],
+    [t, t, t, f, f, f, f, f],
+    [t, f, t, f, f, f, f, on1],
+    [f, f, on1, f, f, on2, t, f],
+    [f, f, on1, on2, on2, f, t, f],
+    [f, f, on1, on2, f, f, t, on2],
+    [on1, on1, f, f, f, on2, t, f],
+    [on1, f, f, f, f, on2, t, on1],
+    [on1, on1, f, on2, on2, f, t, f],
+    [on1, on1, f, on2, f, f, t, on2],
+    [on1, f, f, on2, on2, f, t, on1],
+    [on1, f, f, on2, f, f, t, on1 | on2],
+]
+
+# The forward and backward FSM is obtained by substituting onX with fX | bX under the invariant constraints
+constraint = bdd.add_expr("~(f1 & b1) & ~(f2 & b2)")
+on_to_fb = {"on1": bdd.add_expr("f1 | b1"), "on2": bdd.add_expr("f2 | b2")}
+FSM_fb = [[bdd.let(on_to_fb, u) & constraint for u in row] for row in FSM_on]
+
+FSMs = {"on": FSM_on, "fb": FSM_fb}
+tests = [1, 2, 3, 4, 11, 12, 7, 8, 9, 15, 18, 16, 17, 20, 21]
+residuals = {"on": tests, "fb": tests}
+
+start_time = time.time()
+Rs, Imp, diag_selected, coverage = ts.TestSelectionJoint(FSMs, bdd, residuals)
+end_time = time.time()
+elapsed_time = end_time - start_time
+
+print("Results with TestSelectionJoint:")
+print(f"Computation time: {elapsed_time:.6f} seconds")
+print("Selected residuals :", Rs)
+print("Residual importance:", Imp)
+for name in FSMs:
+    satisfied, achievable = coverage[name]
+    print(f"{name}: selected residuals:", [label for label in Rs if label in residuals[name]])
+    print(f"{name}: {satisfied:d} of {achievable:d} diagnosability properties satisfied")
+
+# %% ======================================================
+# Joint test selection for the 4 and 6 module battery packs loaded into one BDD with merged mode variables.
+# The stored FSMs do not identify residuals that are shared between the packs, so each residual is labeled
+# (pack, index) and belongs to one pack only. Shared residuals are given a common label through the
+# residuals argument of TestSelectionJoint.
+
+bdd = BDD()
+with open("fsm_models.pkl", "rb") as file:
+    models = pickle.load(file)
+
+mode_vars = {
+    "4_module": ["on1", "on2", "on3", "on4"],
+    "6_module": ["on1", "on2", "on3", "on4", "on5", "on6"],
+}
+FSMs = ts.load_fsms(models, mode_vars, bdd)
+
+start_time = time.time()
+Rs, Imp, diag_selected, coverage = ts.TestSelectionJoint(FSMs, bdd)
+end_time = time.time()
+elapsed_time = end_time - start_time
+
+print("Results with TestSelectionJoint:")
+print(f"Computation time: {elapsed_time:.6f} seconds")
+for name in FSMs:
+    selected = [r for pack, r in Rs if pack == name]
+    satisfied, achievable = coverage[name]
+    print(f"{name}: {len(selected):d} residuals selected:", selected)
+    print(f"{name}: {satisfied:d} of {achievable:d} diagnosability properties satisfied")
+print("Residual importance:", Imp)
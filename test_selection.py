@@ -1,3 +1,5 @@
+import csv
+import json
 from functools import reduce
 from tabulate import tabulate
 
@@ -96,7 +98,8 @@ def print_table(FSM, bdd):
         None
     """
     # Convert the data to the format required by tabulate
-    formatted_data = [[str(bdd.to_expr(col)) for col in row] for row in FSM]
+    cache = {}
+    formatted_data = [[to_expr(col, bdd, cache) for col in row] for row in FSM]
     # Print the table
     print(tabulate(formatted_data, tablefmt="grid"))
 
@@ -113,11 +116,103 @@ def print_det(det, bdd):
         None
     """
     # Convert the data to the format required by tabulate
-    formatted_data = [[str(bdd.to_expr(row))] for row in det]
+    cache = {}
+    formatted_data = [[to_expr(row, bdd, cache)] for row in det]
     # Print the table
     print(tabulate(formatted_data, tablefmt="grid"))
 
 
+def to_expr(u, bdd, cache):
+    """
+    Converts a BDD node to an expression string, reusing previously converted nodes.
+
+    Args:
+        u (bdd): A Boolean function in the BDD manager `bdd`.
+        bdd (BDD): A binary decision diagram (BDD) object used to convert FSM elements to expressions.
+        cache (dict): A dictionary mapping BDD nodes to expression strings. It is updated in place and can be shared between calls using the same BDD manager.
+
+    Returns:
+        str: The expression string of `u`.
+    """
+    expr = cache.get(u)
+    if expr is None:
+        expr = str(bdd.to_expr(u))
+        cache[u] = expr
+    return expr
+
+
+def export_table(FSM, bdd, file, fmt="csv", cache=None):
+    """
+    Writes a Fault Signature Matrix (FSM) or a diagnosability matrix to a file, one row at a time.
+
+    The rows are formatted and written as they are visited, so the formatted matrix is never built in memory. Expression strings are memoized per BDD node, so identical Boolean functions are only converted once.
+
+    Args:
+        FSM (list of list of bdds): A 2D list of Boolean functions, for example a Fault Signature Matrix or a diagnosability matrix.
+        bdd (BDD): A binary decision diagram (BDD) object used to convert FSM elements to expressions.
+        file (str or file object): A file name or an open text file to write to.
+        fmt (str): The output format.
+            - "csv": One line per row with the expression of each element.
+            - "json": A JSON list of rows where each row is a list of expressions.
+            - "nodes": A compact node table. Each distinct Boolean function is written once as a line `n,<id>,<expr>` the first time it occurs, and each row is written as a line `r,<id>,<id>,...` referring to the node ids. The ids are numbered in order of first occurrence.
+        cache (dict, optional): A dictionary mapping BDD nodes to expression strings that is shared between exports using the same BDD manager.
+
+    Returns:
+        None
+    """
+    if fmt not in ("csv", "json", "nodes"):
+        raise ValueError(f"Unknown export format: {fmt}")
+    if cache is None:
+        cache = {}
+
+    if isinstance(file, str):
+        with open(file, "w", newline="") as fp:
+            _write_table(FSM, bdd, fp, fmt, cache)
+    else:
+        _write_table(FSM, bdd, file, fmt, cache)
+
+
+def export_det(det, bdd, file, fmt="csv", cache=None):
+    """
+    Writes a detectability vector to a file, one fault per row.
+
+    Args:
+        det (list of bdds): A list where each element is a Boolean function representing the detectability of a fault.
+        bdd (BDD): A binary decision diagram (BDD) object used to convert FSM elements to expressions.
+        file (str or file object): A file name or an open text file to write to.
+        fmt (str): The output format, "csv", "json" or "nodes". See `export_table`.
+        cache (dict, optional): A dictionary mapping BDD nodes to expression strings that is shared between exports using the same BDD manager.
+
+    Returns:
+        None
+    """
+    export_table(([u] for u in det), bdd, file, fmt, cache)
+
+
+def _write_table(FSM, bdd, fp, fmt, cache):
+    if fmt == "csv":
+        writer = csv.writer(fp, lineterminator="\n")
+        for row in FSM:
+            writer.writerow([to_expr(u, bdd, cache) for u in row])
+    elif fmt == "json":
+        fp.write("[")
+        sep = "\n"
+        for row in FSM:
+            fp.write(sep + json.dumps([to_expr(u, bdd, cache) for u in row]))
+            sep = ",\n"
+        fp.write("\n]\n")
+    else:
+        writer = csv.writer(fp, lineterminator="\n")
+        # Node ids in order of first occurrence, so that exports of different model revisions can be compared
+        ids = {}
+        for row in FSM:
+            for u in row:
+                if u not in ids:
+                    ids[u] = len(ids)
+                    writer.writerow(["n", ids[u], to_expr(u, bdd, cache)])
+            writer.writerow(["r"] + [ids[u] for u in row])
+
+
 def TestSelection(FSM, bdd):
     """
     Selects a set of residuals given a Fault Signature Matrix (FSM) with maximum diagnosability.
@@ -294,3 +389,161 @@ def TestSelectionAssignments(FSM, nvars, bdd):
         Rr.remove(Rs[-1])
         Imp.append(max_imp)
     return Rs, Imp, diag_selected
+
+
+def load_fsms(models, mode_vars, bdd):
+    """
+    Loads several Fault Signature Matrices (FSMs) given as expression strings into one shared BDD manager.
+
+    The mode variables of all configurations are merged and declared once, so Boolean functions that are common to several configurations are represented by the same BDD nodes.
+
+    Args:
+        models (dict): A dictionary mapping a configuration name to an FSM where each element is an expression string, e.g., as stored in `fsm_models.pkl`.
+        mode_vars (dict): A dictionary mapping a configuration name to a list of the names of its mode variables.
+        bdd (BDD): A binary decision diagram (BDD) object shared by all configurations.
+
+    Returns:
+        dict: A dictionary mapping each configuration name to its FSM as a 2D list of bdds.
+    """
+    # Declare the union of the mode variables, keeping the order of first occurrence
+    names = []
+    for name in models:
+        for var in mode_vars[name]:
+            if var not in names:
+                names.append(var)
+    bdd.declare(*names)
+
+    return {name: [[bdd.add_expr(expr) for expr in row] for row in FSM] for name, FSM in models.items()}
+
+
+def TestSelectionJoint(FSMs, bdd, residuals=None):
+    """
+    Selects a set of residuals with maximum combined diagnosability over several system configurations.
+
+    All FSMs must be defined in the same BDD manager, e.g., loaded with `load_fsms`. A residual that is implemented in several configurations is identified by a common label and is selected in all of them at once. The improvement of a residual is the sum over the configurations of the number of diagnosability properties that become satisfied in some mode, as in `TestSelection`.
+
+    The selected residuals are the same as if the improvements were computed for all remaining residuals in each iteration, as in `TestSelection`. Since an improvement never increases when more residuals are selected, the improvements are only recomputed for the residuals that can still have the highest improvement. The improvement of a residual in a configuration is also kept until a residual implemented in that configuration is selected. Configurations with node-for-node identical rows and the same selected diagnosability share the diagnosability matrices and the improvements of these rows. Rows that differ, e.g., rows built over other mode variables, share nothing but the BDD manager.
+
+    Args:
+        FSMs (dict): A dictionary mapping a configuration name to its Fault Signature Matrix (FSM), a 2D list of bdds where each row corresponds to a test and each column corresponds to a fault.
+        bdd (BDD): A binary decision diagram (BDD) object shared by all configurations.
+        residuals (dict, optional): A dictionary mapping a configuration name to a list of residual labels, one for each row of its FSM. Rows with the same label in different configurations are the same residual. If not given, or if a configuration is missing, the residuals of that configuration are labeled `(name, index)` and are not shared.
+
+    Returns:
+    tuple:
+        - Rs (list): A list of labels of the selected residuals.
+        - Imp (list): A list of improvement values corresponding to each selected residual, summed over the configurations.
+        - diag_selected (dict): A dictionary mapping each configuration name to the diagnosability matrix of its selected residuals.
+        - coverage (dict): A dictionary mapping each configuration name to a tuple (satisfied, achievable) with the number of diagnosability properties satisfied by the selected residuals and by all residuals of the configuration.
+    """
+    if residuals is None:
+        residuals = {}
+
+    # Initialize
+    labels = {}
+    for name, FSM in FSMs.items():
+        if len(FSM) == 0:
+            raise ValueError(f"Configuration {name} has no residuals")
+        labels[name] = residuals.get(name, [(name, i) for i in range(len(FSM))])
+        if len(labels[name]) != len(FSM):
+            raise ValueError(f"Configuration {name} has {len(FSM)} residuals but {len(labels[name])} labels")
+        if len(set(labels[name])) != len(labels[name]):
+            raise ValueError(f"Configuration {name} has duplicate residual labels")
+
+    # For each residual label, the configurations and rows where it is implemented
+    Rr = []
+    rows_of = {}
+    for name in FSMs:
+        for i, label in enumerate(labels[name]):
+            if label not in rows_of:
+                rows_of[label] = []
+                Rr.append(label)
+            rows_of[label].append((name, i))
+
+    # Initialize the diagnosability of the selected residuals. Each distinct selected diagnosability matrix has a
+    # version number, and configurations with the same version share the same matrix.
+    empty = {}
+    version = {}
+    diag_selected = {}
+    for name, FSM in FSMs.items():
+        rows = len(FSM[0])
+        cols = rows + 1
+        if rows not in empty:
+            empty[rows] = (len(empty), [[bdd.false] * cols for _ in range(rows)])
+        version[name], diag_selected[name] = empty[rows]
+    next_version = len(empty)
+
+    # Compute the diagnosability matrix for all residuals and the diagnosability of all residuals of each
+    # configuration. Residuals with identical rows share the same BDD nodes, so their diagnosability matrix is
+    # only computed once.
+    computed = {}
+    res_diag = {}
+    achievable = {}
+    for name, FSM in FSMs.items():
+        res_diag[name] = []
+        for res in FSM:
+            key = tuple(res)
+            if key not in computed:
+                computed[key] = Diagnosability([res])
+            res_diag[name].append(computed[key])
+        achievable[name] = reduce(
+            lambda x, y: [[a | b for a, b in zip(row1, row2)] for row1, row2 in zip(x, y)], res_diag[name]
+        )
+
+    # Improvement of a residual matrix given the version of a selected diagnosability matrix, kept between the
+    # iterations. The residual matrices are kept in `computed`, so their ids stay valid.
+    gain = {}
+    # The improvement of a residual never increases when more residuals are selected, so the last computed
+    # improvement is an upper bound of the current one.
+    bound = {label: float("inf") for label in Rr}
+    Rs = []
+    Imp = []
+    while Rr != []:
+        # Evaluate the residuals in order of decreasing bound until no remaining residual can beat the best one
+        max_imp = -1
+        index_of_max = None
+        for i in sorted(range(len(Rr)), key=lambda i: -bound[Rr[i]]):
+            if bound[Rr[i]] < max_imp or (bound[Rr[i]] == max_imp and i > index_of_max):
+                break
+            improvement = 0
+            for name, r in rows_of[Rr[i]]:
+                key = (id(res_diag[name][r]), version[name])
+                if key not in gain:
+                    result = [
+                        [a & ~b for a, b in zip(row1, row2)]
+                        for row1, row2 in zip(res_diag[name][r], diag_selected[name])
+                    ]
+                    gain[key] = sum(1 for row in result for value in row if value != bdd.false)
+                improvement += gain[key]
+            bound[Rr[i]] = improvement
+            if improvement > max_imp or (improvement == max_imp and i < index_of_max):
+                max_imp = improvement
+                index_of_max = i
+        if max_imp == 0:
+            break
+        # select the first residual with the highest improvement in all configurations implementing it
+        updated = {}
+        for name, r in rows_of[Rr[index_of_max]]:
+            key = (id(res_diag[name][r]), version[name])
+            if key not in updated:
+                new = [[a | b for a, b in zip(row1, row2)] for row1, row2 in zip(res_diag[name][r], diag_selected[name])]
+                updated[key] = (next_version, new)
+                next_version += 1
+            version[name], diag_selected[name] = updated[key]
+        # Only the improvements in the updated configurations are outdated
+        current = set(version.values())
+        gain = {key: value for key, value in gain.items() if key[1] in current}
+        Rs.append(Rr[index_of_max])
+        Rr.remove(Rs[-1])
+        Imp.append(max_imp)
+
+    # Coverage of each configuration compared to using all its residuals
+    coverage = {}
+    for name in FSMs:
+        coverage[name] = (
+            sum(1 for row in diag_selected[name] for value in row if value != bdd.false),
+            sum(1 for row in achievable[name] for value in row if value != bdd.false),
+        )
+    # Configurations may share the selected matrices, so each configuration gets its own copy
+    diag_selected = {name: [row[:] for row in m] for name, m in diag_selected.items()}
+    return Rs, Imp, diag_selected, coverage